@@ -3,8 +3,7 @@
 Telethon AI Bot - Main entry point
 """
 
-from src.main import main
-import asyncio
+from src.main import run
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    run()
\ No newline at end of file
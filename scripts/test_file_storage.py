@@ -98,12 +98,12 @@ async def test_file_storage():
     print("\n6. Testing file deletion...")
     try:
         # Clean up test files
-        if file_handler.delete_image(image_path):
+        if await file_handler.delete_image(image_path):
             print(f"   ✓ Deleted user image")
         else:
             print(f"   ✗ Failed to delete user image")
             
-        if 'perm_path' in locals() and file_handler.delete_image(perm_path):
+        if 'perm_path' in locals() and await file_handler.delete_image(perm_path):
             print(f"   ✓ Deleted generated image")
         else:
             print(f"   ✗ Failed to delete generated image")
@@ -8,6 +8,7 @@ from .decorators import require_authorization, require_superadmin
 from ..database import DatabaseManager
 from ..config.settings import settings
 from ..utils import MessageSplitter
+from ..llm.cache import get_response_cache
 
 
 class CommandHandler:
@@ -93,7 +94,8 @@ class CommandHandler:
                 "**Superadmin Commands:**\n"
                 "• `/whitelist` - Show all whitelisted users\n"
                 "• `/allow @username` or `/allow id::123456789` - Add user to whitelist\n"
-                "• `/deny @username` or `/deny id::123456789` - Remove user from whitelist\n\n"
+                "• `/deny @username` or `/deny id::123456789` - Remove user from whitelist\n"
+                "• `/cachestats` - Show LLM response cache hit/miss counts\n\n"
             )
         
         help_message += (
@@ -354,6 +356,22 @@ class CommandHandler:
         
         await event.reply(message, parse_mode='markdown')
     
+    @require_superadmin
+    async def handle_cache_stats(self, event):
+        """Handle /cachestats command - shows response cache counters (superadmin only)"""
+        cache = get_response_cache()
+        lookups = cache.hits + cache.misses
+        hit_rate = cache.hits / lookups * 100 if lookups else 0.0
+        
+        message = (
+            f"📊 **Response Cache**\n\n"
+            f"Hits: {cache.hits}\n"
+            f"Misses: {cache.misses}\n"
+            f"Hit rate: {hit_rate:.1f}%"
+        )
+        
+        await event.reply(message, parse_mode='markdown')
+    
     @require_authorization
     async def handle_userinfo(self, event):
         """Handle /userinfo command - get info about a user"""
@@ -460,6 +478,11 @@ class CommandHandler:
             events.NewMessage(pattern='/whitelist')
         )
         
+        self.client.add_event_handler(
+            self.handle_cache_stats,
+            events.NewMessage(pattern='/cachestats')
+        )
+        
         self.client.add_event_handler(
             self.handle_userinfo,
             events.NewMessage(pattern='/userinfo')
@@ -4,6 +4,7 @@ from telethon import events
 from google import genai
 from google.genai import types
 import base64
+import json
 import traceback
 import logging
 import os
@@ -22,6 +23,20 @@ from ..utils.file_handler import file_handler
 logger = logging.getLogger(__name__)
 
 
+def _safe_repr(messages) -> str:
+    """Compact JSON of conversation messages with base64 image payloads elided"""
+    return json.dumps(
+        [
+            {**msg, "image_data": f"<base64 {len(msg['image_data'])} chars>"}
+            if msg.get("image_data") else msg
+            for msg in messages
+        ],
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+
+
 class MessageHandler:
     """Handles regular messages and AI interactions"""
     
@@ -77,7 +92,8 @@ class MessageHandler:
         
         # Get conversation history
         messages = await self.db_manager.get_conversation_messages(conversation.id)
-        print(f"Conversation messages: {messages}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Conversation messages: %s", _safe_repr(messages))
         
         # Add user context as the first message if this is a new conversation
         if len(messages) == 1:  # Only the current message
@@ -86,14 +102,16 @@ class MessageHandler:
                 user_context += f" (@{user.username})"
             user_context += ". Respond in a friendly and helpful manner."
             
-            # Insert context at the beginning
+            # Insert context at the beginning (marked so per-prompt caches can skip it)
             messages.insert(0, {
                 "role": "user",
-                "content": user_context
+                "content": user_context,
+                "context": True
             })
             messages.insert(1, {
                 "role": "assistant",
-                "content": "I understand. I'll help you with your questions."
+                "content": "I understand. I'll help you with your questions.",
+                "context": True
             })
         
         # Get user settings
@@ -117,7 +135,7 @@ class MessageHandler:
             use_streaming = (provider in ["openai", "anthropic", "gemini"]) and not is_image_gen_model
             
             # Build provider-specific options
-            llm_options = {}
+            llm_options = {"conversation_id": conversation.id}
             if provider == "gemini":
                 llm_options["thinking_tokens"] = settings_dict.get("gemini_thinking_tokens", 2048)
             elif provider == "openai":
@@ -331,6 +349,7 @@ class MessageHandler:
         message_overflow_handled = False
         chunks_since_update = 0
         min_chunks_before_update = 5  # Accumulate at least 5 chunks before updating
+        first_chunk_shown = False  # The first text is shown immediately to cut perceived latency
         
         # Prepare footer
         temp = settings_dict["temperature"]
@@ -369,7 +388,7 @@ class MessageHandler:
                 # Check if the client supports streaming
                 if hasattr(llm_client, 'generate_response_stream'):
                     # Provider-specific options
-                    llm_options = {}
+                    llm_options = {"conversation_id": conversation.id}
                     if provider == "gemini":
                         llm_options["thinking_tokens"] = settings_dict.get("gemini_thinking_tokens", 2048)
                     elif provider == "openai":
@@ -394,7 +413,9 @@ class MessageHandler:
                         time_to_update = current_time - last_update_time >= update_interval
                         enough_chunks = chunks_since_update >= min_chunks_before_update
                         
-                        if time_to_update and enough_chunks:
+                        if (time_to_update and enough_chunks) or not first_chunk_shown:
+                            # Only one immediate attempt; failures fall back to the throttled schedule
+                            first_chunk_shown = True
                             try:
                                 # Check if message would be too long
                                 display_text = accumulated_response + streaming_indicator
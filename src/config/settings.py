@@ -81,11 +81,27 @@ class Settings:
     
     # Legacy proxy endpoints removed; all calls go direct.
     
+    # Maximum concurrent Gemini API requests across all chats
+    GEMINI_MAX_CONCURRENCY: int = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+    
     # Message Settings
     MAX_MESSAGE_LENGTH: int = 3000  # Telegram limit is 4096, leave buffer
     
     # Cache Settings
     WHITELIST_CACHE_TTL: int = 60  # seconds
+    # Exact-match LLM response cache (deterministic requests only)
+    LLM_CACHE_TTL: int = int(os.getenv("LLM_CACHE_TTL", "3600"))  # seconds
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+    LLM_CACHE_REDIS_URL: str = os.getenv("LLM_CACHE_REDIS_URL", "")  # requires the redis extra
+    # Semantic cache for paraphrased prompts (requires the semantic-cache extra)
+    SEMANTIC_CACHE_ENABLED: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+    SEMANTIC_CACHE_DIR: str = os.getenv("SEMANTIC_CACHE_DIR", "")
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+    # Gemini context caching for long leading messages; 0 disables it
+    GEMINI_CONTEXT_CACHE_MIN_TOKENS: int = int(os.getenv("GEMINI_CONTEXT_CACHE_MIN_TOKENS", "1024"))
+    # Disk-backed Gemini response cache for batch jobs; disabled when unset
+    GEMINI_CACHE_DIR: str = os.getenv("GEMINI_CACHE_DIR", "")
+    GEMINI_CACHE_TTL: int = int(os.getenv("GEMINI_CACHE_TTL", "604800"))  # seconds
     
     @classmethod
     def validate(cls) -> bool:
@@ -31,4 +31,8 @@ FILE_EXTENSION_MAP = {
     "image/bmp": ".bmp"
 }
 
+# Reverse lookup for stored files; ".jpeg" is accepted alongside ".jpg"
+MIME_TYPE_MAP = {extension: mime_type for mime_type, extension in FILE_EXTENSION_MAP.items()}
+MIME_TYPE_MAP[".jpeg"] = "image/jpeg"
+
 DEFAULT_IMAGE_EXTENSION = ".jpg"
\ No newline at end of file
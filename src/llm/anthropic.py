@@ -6,7 +6,7 @@ from typing import List, Dict, Any, AsyncGenerator, Optional
 from google import genai
 from google.genai import types
 
-from .base import BaseLLMClient
+from .base import BaseLLMClient, GENAI_ROLE_MAP
 from ..config.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -41,8 +41,7 @@ class AnthropicClient(BaseLLMClient):
                 })
             if not parts:
                 continue
-            role = "user" if msg["role"] == "user" else "model"
-            formatted.append({"role": role, "parts": parts})
+            formatted.append({"role": GENAI_ROLE_MAP.get(msg["role"], "user"), "parts": parts})
         return formatted
 
     async def generate_response(
@@ -3,6 +3,9 @@
 from abc import ABC, abstractmethod
 from typing import List, Dict, Any, AsyncGenerator, Optional
 
+# Maps message roles to google-genai roles, which use "model" for assistant turns
+GENAI_ROLE_MAP = {"user": "user", "assistant": "model", "model": "model", "system": "user"}
+
 
 class BaseLLMClient(ABC):
     """Abstract base class for LLM clients"""
@@ -0,0 +1,222 @@
+"""Response caching for LLM clients"""
+
+import asyncio
+import functools
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Protocol, Tuple
+
+import orjson
+
+from ..config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(payload: Dict[str, Any]) -> str:
+    """Return a stable SHA-256 hex digest for a request payload"""
+    # orjson encodes straight to bytes, which matters for payloads carrying base64 images
+    data = orjson.dumps(payload, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return hashlib.sha256(data).hexdigest()
+
+
+class CacheBackend(Protocol):
+    """Storage interface used by LLMCache"""
+
+    async def get(self, key: str) -> Optional[str]:
+        ...
+
+    async def set(self, key: str, value: str, ttl: int):
+        ...
+
+    async def delete(self, key: str):
+        ...
+
+
+class MemoryBackend:
+    """In-process LRU cache with per-entry expiry"""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        # No awaits happen between reads and writes, so the event loop
+        # already serializes access and no lock is needed
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: int):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def delete(self, key: str):
+        self._entries.pop(key, None)
+
+
+class SqliteBackend:
+    """SQLite-backed cache that survives process restarts"""
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(directory, "responses.db"),
+            check_same_thread=False,
+        )
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time():
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            return row[0]
+
+    def _set(self, key: str, value: str, ttl: int):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl),
+            )
+            self._conn.commit()
+
+    def _delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._conn.commit()
+
+    async def get(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: str, ttl: int):
+        await asyncio.to_thread(self._set, key, value, ttl)
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(self._delete, key)
+
+
+class RedisBackend:
+    """Redis-backed cache shared between bot processes (requires the redis extra)"""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: str, ttl: int):
+        await self._client.set(key, value, ex=ttl)
+
+    async def delete(self, key: str):
+        await self._client.delete(key)
+
+
+class LLMCache:
+    """Exact-match response cache keyed by request hash"""
+
+    def __init__(self, backend: CacheBackend, ttl: int = 3600):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return the cached response for key, or None on a miss (including backend errors)"""
+        try:
+            value = await self.backend.get(key)
+        except Exception as e:
+            # A broken or slow backend must never fail the request itself
+            logger.warning("Response cache lookup failed, treating as miss: %s", e)
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: str):
+        """Store a response under key for the configured TTL; backend errors are logged and ignored"""
+        try:
+            await self.backend.set(key, value, self.ttl)
+        except Exception as e:
+            logger.warning("Response cache store failed: %s", e)
+
+    async def delete(self, key: str):
+        """Drop a cached response"""
+        await self.backend.delete(key)
+
+
+class InflightRequests:
+    """Lets concurrent identical requests share a single upstream call"""
+
+    def __init__(self):
+        self._futures: Dict[str, asyncio.Future] = {}
+
+    async def run(self, key: str, produce: Callable[[], Awaitable[Any]]) -> Any:
+        """Await the in-flight call for key, or start one with produce()"""
+        future = self._futures.get(key)
+        if future is not None:
+            # shield so a cancelled follower does not cancel the leader's result
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._futures[key] = future
+        try:
+            result = await produce()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an exception nobody else waited for is not logged
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._futures.pop(key, None)
+
+
+@functools.lru_cache(maxsize=None)
+def get_response_cache() -> LLMCache:
+    """Return the process-wide response cache (Redis if configured, else memory)"""
+    if settings.LLM_CACHE_REDIS_URL:
+        backend = RedisBackend(settings.LLM_CACHE_REDIS_URL)
+    else:
+        backend = MemoryBackend(maxsize=settings.LLM_CACHE_MAX_ENTRIES)
+    return LLMCache(backend, ttl=settings.LLM_CACHE_TTL)
+
+
+@functools.lru_cache(maxsize=None)
+def open_disk_cache(directory: str, ttl: int) -> LLMCache:
+    """Return the shared SQLite-backed cache for a directory, opening it on first use"""
+    return LLMCache(SqliteBackend(directory), ttl=ttl)
@@ -1,17 +1,248 @@
 """Gemini LLM client implementation (Vertex AI via google-genai)"""
 
 from google import genai
-from google.genai import types
+from google.genai import errors, types
 from typing import List, Dict, Any, Optional, Tuple, AsyncGenerator
+import asyncio
 import base64
+import functools
+import hashlib
+from collections import OrderedDict
 from PIL import Image
 import io
+import logging
 import os
 import tempfile
-from datetime import datetime
+import itertools
+import time
 
-from .base import BaseLLMClient
+from .base import BaseLLMClient, GENAI_ROLE_MAP
+from .cache import InflightRequests, make_cache_key, get_response_cache, open_disk_cache
+from .semantic_cache import get_semantic_cache
 from ..config.settings import settings
+from ..config.storage import FILE_EXTENSION_MAP
+
+logger = logging.getLogger(__name__)
+
+# Streaming output is flushed once this many characters are buffered
+# or this many seconds have passed since the last flush
+STREAM_FLUSH_CHARS = 64
+STREAM_FLUSH_INTERVAL = 0.08
+
+# Identical low-temperature requests in flight at the same time share one API call
+_inflight_requests = InflightRequests()
+
+# Disambiguates generated image filenames within the process
+_image_counter = itertools.count()
+
+# Raw image bytes are written to disk in slices of this size
+_WRITE_CHUNK_SIZE = 64 * 1024
+
+# Image parts for flash image generation, keyed by hash of the base64 payload
+_FLASH_IMAGE_CACHE: "OrderedDict[int, types.Part]" = OrderedDict()
+_FLASH_IMAGE_CACHE_SIZE = 64
+
+# Formatted history per conversation: (message count, first and last message
+# fingerprints, formatted contents), so each turn only formats new messages
+_FORMATTED_HISTORY: "OrderedDict[Any, Tuple[int, Tuple, Tuple, List[types.Content]]]" = OrderedDict()
+_FORMATTED_HISTORY_SIZE = 64
+
+# Server-side context caches for long leading messages:
+# (model, message hash) -> (cache name or None if creation failed, expiry)
+_CONTEXT_CACHES: Dict[Tuple[str, str], Tuple[Optional[str], float]] = {}
+CONTEXT_CACHE_TTL = 3600  # seconds
+
+# Created lazily so it binds to the running event loop
+_request_semaphore: Optional[asyncio.Semaphore] = None
+
+# Transient upstream errors (rate limited / unavailable) retried with exponential backoff
+_RETRYABLE_STATUS_CODES = frozenset({429, 503})
+RETRY_ATTEMPTS = 4
+RETRY_BASE_DELAY = 0.5  # seconds
+RETRY_MAX_DELAY = 8  # seconds
+
+# The search tool carries no per-request state, so one instance is shared
+_GOOGLE_SEARCH_TOOL = types.Tool(google_search=types.GoogleSearch())
+
+
+@functools.lru_cache(maxsize=None)
+def _get_genai_client(project: str, location: str) -> genai.Client:
+    """Return the shared Vertex AI client so its connection pool is reused across instances"""
+    return genai.Client(
+        vertexai=True,
+        project=project,
+        location=location,
+    )
+
+
+def _get_request_semaphore() -> asyncio.Semaphore:
+    """Return the process-wide semaphore that caps in-flight Gemini requests"""
+    global _request_semaphore
+    if _request_semaphore is None:
+        # A zero or negative limit would block every request forever
+        _request_semaphore = asyncio.Semaphore(max(1, settings.GEMINI_MAX_CONCURRENCY))
+    return _request_semaphore
+
+
+@functools.lru_cache(maxsize=32)
+def _thinking_config(budget_tokens: int) -> types.ThinkingConfig:
+    """Build a thinking config, shared by every generation config with the same budget"""
+    return types.ThinkingConfig(
+        include_thoughts=True,
+        budget_tokens=budget_tokens,
+    )
+
+
+@functools.lru_cache(maxsize=128)
+def _build_config(
+    temperature: float,
+    max_tokens: Optional[int],
+    thinking_tokens: Optional[int],
+    web_search: bool,
+) -> types.GenerateContentConfig:
+    """Build a generation config, cached per parameter combination to skip model validation
+    
+    Callers round temperature so near-identical values share one entry.
+    """
+    config_params = {"temperature": temperature}
+    if max_tokens is not None:
+        config_params["max_output_tokens"] = max_tokens
+    
+    # Thinking budget (always enabled if provided)
+    if thinking_tokens:
+        config_params["thinking_config"] = _thinking_config(thinking_tokens)
+    
+    # Add Google Search tool if enabled
+    if web_search:
+        config_params["tools"] = [_GOOGLE_SEARCH_TOOL]
+        config_params["response_modalities"] = ["TEXT"]
+    
+    return types.GenerateContentConfig(**config_params)
+
+
+@functools.lru_cache(maxsize=None)
+def _image_dir(name: str) -> str:
+    """Return the temp subdirectory path for generated images"""
+    return os.path.join(tempfile.gettempdir(), name)
+
+
+def _image_stem(prefix: str) -> str:
+    """Return a unique filename stem; the counter keeps same-instant saves apart"""
+    return f"{prefix}_{time.time_ns()}_{next(_image_counter)}"
+
+
+def _save_image_file(data: bytes, mime_type: Optional[str], directory: str, stem: str) -> str:
+    """Write encoded image bytes to disk, re-encoding to PNG only for unknown formats
+    
+    Blocking; callers run it in a worker thread.
+    """
+    # Re-created on every save in case the temp dir was cleaned up since the last one
+    os.makedirs(directory, exist_ok=True)
+    # Generated images arrive already encoded (PNG unless stated otherwise),
+    # so known formats are written as-is with the matching extension
+    extension = FILE_EXTENSION_MAP.get(mime_type or "image/png")
+    if extension:
+        filepath = os.path.join(directory, f"{stem}{extension}")
+        # Zero-copy slices keep the write from materializing another full buffer
+        view = memoryview(data)
+        with open(filepath, 'wb') as f:
+            for offset in range(0, len(view), _WRITE_CHUNK_SIZE):
+                f.write(view[offset:offset + _WRITE_CHUNK_SIZE])
+    else:
+        filepath = os.path.join(directory, f"{stem}.png")
+        # Closing the image frees its decoded pixel buffer as soon as it is saved
+        with Image.open(io.BytesIO(data)) as image:
+            image.save(filepath, 'PNG')
+    return filepath
+
+
+def _flash_image_part(image_data: str) -> types.Part:
+    """Wrap a base64 image as raw bytes and serve repeats from a small LRU"""
+    key = hash(image_data)
+    part = _FLASH_IMAGE_CACHE.get(key)
+    if part is not None:
+        _FLASH_IMAGE_CACHE.move_to_end(key)
+        return part
+    
+    # The SDK sends the bytes as-is, so there is no need to decode pixels with PIL
+    part = types.Part.from_bytes(data=base64.b64decode(image_data), mime_type="image/jpeg")
+    _FLASH_IMAGE_CACHE[key] = part
+    if len(_FLASH_IMAGE_CACHE) > _FLASH_IMAGE_CACHE_SIZE:
+        _FLASH_IMAGE_CACHE.popitem(last=False)
+    return part
+
+
+def _message_parts(msg: Dict[str, Any]) -> List[types.Part]:
+    """Build the google-genai parts for a single message"""
+    parts = []
+    if msg.get("content"):
+        parts.append(types.Part(text=msg["content"]))
+    if msg.get("image_data"):
+        # Base64 image data
+        parts.append(types.Part(
+            inline_data=types.Blob(
+                mime_type="image/jpeg",
+                data=base64.b64decode(msg["image_data"]),
+            )
+        ))
+    return parts
+
+
+def _format_messages(messages: List[Dict[str, Any]]) -> List[types.Content]:
+    """Convert messages to google-genai contents"""
+    # Most conversations carry no images at all
+    if not any(msg.get("image_data") for msg in messages):
+        return _prepare_text_messages(messages)
+    
+    # Messages with neither text nor image are dropped
+    return [
+        types.Content(role=GENAI_ROLE_MAP.get(msg["role"], "user"), parts=_message_parts(msg))
+        for msg in messages
+        if msg.get("content") or msg.get("image_data")
+    ]
+
+
+def _message_fingerprint(msg: Dict[str, Any]) -> Tuple[str, Optional[str], int]:
+    """Cheap identity for a stored message, used to validate cached history"""
+    return (msg["role"], msg.get("content"), len(msg.get("image_data") or ""))
+
+
+def _prepare_text_messages(messages: List[Dict[str, Any]]) -> List[types.Content]:
+    """Specialized _prepare_messages for histories without any images"""
+    return [
+        types.Content(role=GENAI_ROLE_MAP.get(msg["role"], "user"), parts=[types.Part(text=msg["content"])])
+        for msg in messages
+        if msg.get("content")
+    ]
+
+
+def _standalone_prompt(messages: List[Dict[str, Any]]) -> Optional[str]:
+    """Return the prompt text if it is the only real message in the history
+    
+    The semantic cache is shared by every user and keyed on the prompt (within
+    the scope from _semantic_scope), so follow-ups that depend on earlier turns must never hit or populate it.
+    Synthetic context messages (marked with "context") are ignored.
+    """
+    real = [msg for msg in messages if not msg.get("context")]
+    if len(real) != 1:
+        return None
+    msg = real[0]
+    if msg["role"] != "user" or msg.get("image_data"):
+        return None
+    return msg.get("content") or None
+
+
+def _semantic_scope(messages: List[Dict[str, Any]], model_name: str) -> str:
+    """Return the semantic cache scope for a request
+    
+    Context messages carry per-user details (e.g. the user's name), so they are
+    hashed into the scope and personalised replies are only reused for the same context.
+    """
+    context = [msg.get("content") or "" for msg in messages if msg.get("context")]
+    if not context:
+        return model_name
+    digest = hashlib.sha256("\0".join(context).encode("utf-8")).hexdigest()[:16]
+    return f"{model_name}:{digest}"
 
 
 class GeminiClient(BaseLLMClient):
@@ -19,52 +250,65 @@ class GeminiClient(BaseLLMClient):
     
     def __init__(self):
         """Initialize Gemini client for Vertex AI using ADC"""
-        self.client = genai.Client(
-            vertexai=True,
-            project=settings.GCP_PROJECT,
-            location=settings.GCP_LOCATION,
-        )
+        self.client = _get_genai_client(settings.GCP_PROJECT, settings.GCP_LOCATION)
         # GA model IDs
         self.models = {
             "flash": "gemini-2.5-flash",
             "pro": "gemini-2.5-pro",
         }
+        # Image-generation model IDs, resolved once (none are configured by default)
+        self._flash_image_model = self.models.get("flash-image")
+        self._imagen3_model = self.models.get("imagen3")
+        self._image_gen_models = frozenset(
+            model for model in (self._flash_image_model, self._imagen3_model) if model
+        )
+        # Bounds concurrent API calls across all client instances
+        self._sem = _get_request_semaphore()
+        # Exact-match cache for deterministic (temperature 0) requests
+        self._cache = get_response_cache()
+        # Optional embedding cache that also matches paraphrased prompts
+        self._semantic_cache = get_semantic_cache()
+        # Optional disk cache so interrupted batch runs resume without re-billing
+        self._disk_cache = (
+            open_disk_cache(settings.GEMINI_CACHE_DIR, settings.GEMINI_CACHE_TTL)
+            if settings.GEMINI_CACHE_DIR
+            else None
+        )
     
-    def _prepare_messages(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Prepare messages for google-genai API format"""
-        formatted_messages = []
+    def _prepare_messages(self, messages: List[Dict[str, Any]], conversation_id: Any = None) -> List[types.Content]:
+        """Prepare messages for google-genai API format
         
-        for msg in messages:
-            content_parts = []
-            
-            # Add text content
-            if msg.get("content"):
-                content_parts.append({"text": msg["content"]})
-            
-            # Add image if present
-            if msg.get("image_data"):
-                try:
-                    # Base64 image data
-                    content_parts.append({
-                        "inline_data": {
-                            "mime_type": "image/jpeg",
-                            "data": msg["image_data"]
-                        }
-                    })
-                except Exception as e:
-                    print(f"Error processing image: {e}")
-            
-            # Only add message if it has content
-            if content_parts:
-                # Map role names - google-genai uses "model" not "assistant"
-                role = "user" if msg["role"] == "user" else "model"
-                
-                formatted_messages.append({
-                    "role": role,
-                    "parts": content_parts
-                })
+        With a conversation_id, the formatted history from the previous turn
+        is reused and only the newly appended messages are formatted.
+        """
+        if conversation_id is None or not messages:
+            return _format_messages(messages)
         
-        return formatted_messages
+        # Stored history is append-only, so matching the first message and the
+        # last previously seen message is enough to trust the cached prefix
+        formatted = None
+        cached = _FORMATTED_HISTORY.get(conversation_id)
+        if cached:
+            count, first, last, prefix = cached
+            if (
+                count <= len(messages)
+                and _message_fingerprint(messages[0]) == first
+                and _message_fingerprint(messages[count - 1]) == last
+            ):
+                formatted = prefix + _format_messages(messages[count:])
+        if formatted is None:
+            formatted = _format_messages(messages)
+        
+        _FORMATTED_HISTORY[conversation_id] = (
+            len(messages),
+            _message_fingerprint(messages[0]),
+            _message_fingerprint(messages[-1]),
+            formatted,
+        )
+        _FORMATTED_HISTORY.move_to_end(conversation_id)
+        if len(_FORMATTED_HISTORY) > _FORMATTED_HISTORY_SIZE:
+            _FORMATTED_HISTORY.popitem(last=False)
+        return formatted
     
     def _prepare_flash_image_contents(self, messages: List[Dict[str, Any]]) -> List[Any]:
         """Prepare contents for Gemini 2.0 Flash image generation as a flat list"""
@@ -81,10 +325,8 @@ class GeminiClient(BaseLLMClient):
                 # Add image if present
                 if msg.get("image_data"):
                     try:
-                        # Create PIL Image from base64 data
-                        image_data = base64.b64decode(msg["image_data"])
-                        image = Image.open(io.BytesIO(image_data))
-                        contents.append(image)
+                        # Same history is re-sent every turn, so reuse built parts
+                        contents.append(_flash_image_part(msg["image_data"]))
                     except Exception as e:
                         print(f"Error processing image for flash generation: {e}")
         
@@ -102,100 +344,257 @@ class GeminiClient(BaseLLMClient):
     ) -> str:
         """Generate a response using google-genai API"""
         try:
-            # Use full conversation history for Gemini text models
-            messages_to_use = messages
+            thinking_tokens = int(options["thinking_tokens"]) if options and options.get("thinking_tokens") else None
+            conversation_id = options.get("conversation_id") if options else None
             
-            # Prepare messages based on model type
-            formatted_messages = self._prepare_messages(messages_to_use)
+            is_image_gen = model_name in self._image_gen_models
             
-            # Build generation config
-            config_params = {"temperature": temperature}
-            if max_tokens is not None:
-                config_params["max_output_tokens"] = max_tokens
+            # Only temperature 0 is deterministic enough for the shared cache, and
+            # grounded answers are never reused so search results stay fresh;
+            # the opt-in disk cache stores every other answer for batch reruns.
+            # Generated images are written to temp paths and never reused.
+            use_memory_cache = temperature == 0 and not web_search_mode and not is_image_gen
+            # Low temperatures are close enough to deterministic to share a single call
+            coalesce = temperature <= 0.3 and not is_image_gen
+            use_disk_cache = self._disk_cache is not None and not web_search_mode and not is_image_gen
+            cache_key = None
+            if coalesce or use_disk_cache:
+                cache_key = make_cache_key({
+                    "model": model_name,
+                    "messages": messages,
+                    "max_tokens": max_tokens,
+                    "temperature": temperature,
+                    "thinking_mode": thinking_mode,
+                    "thinking_tokens": thinking_tokens,
+                    "web_search_mode": web_search_mode,
+                })
+                cached = await self._get_cached_response(cache_key, use_memory_cache, use_disk_cache)
+                if cached is not None:
+                    return cached
             
-            # Add thinking config if enabled
-            # Thinking budget (always enabled if provided)
-            if options and options.get("thinking_tokens"):
-                config_params["thinking_config"] = types.ThinkingConfig(
-                    include_thoughts=True,
-                    budget_tokens=int(options["thinking_tokens"]),
-                )
+            # Semantic lookup for a conversation's opening prompt; skipped for web search to keep answers fresh
+            prompt_vector = None
+            semantic_scope = _semantic_scope(messages, model_name)
+            if self._semantic_cache and temperature <= 0.3 and not web_search_mode and not is_image_gen:
+                prompt = _standalone_prompt(messages)
+                if prompt:
+                    cached, prompt_vector = await self._semantic_cache.lookup(prompt, semantic_scope)
+                    if cached is not None:
+                        return cached
             
-            # Add Google Search tool if enabled
-            if web_search_mode:
-                google_search_tool = types.Tool(
-                    google_search=types.GoogleSearch()
+            async def produce() -> str:
+                formatted_messages, generation_config = await self._prepare_request(
+                    messages, model_name, max_tokens, temperature, thinking_tokens, web_search_mode, conversation_id
                 )
-                config_params["tools"] = [google_search_tool]
-                config_params["response_modalities"] = ["TEXT"]
-            
-            generation_config = types.GenerateContentConfig(**config_params)
+                response, cacheable = await self._execute_non_stream(
+                    formatted_messages, model_name, generation_config, web_search_mode
+                )
+                if cacheable:
+                    if cache_key:
+                        await self._store_cached_response(cache_key, response, use_memory_cache, use_disk_cache)
+                    if prompt_vector is not None:
+                        await self._semantic_cache.add(prompt_vector, semantic_scope, response)
+                return response
             
-            print(f"Generating response with model: {model_name}, config: {generation_config}")
-            # Generate response
-            response = await self.client.aio.models.generate_content(
-                model=model_name,
-                contents=formatted_messages,
-                config=generation_config,
-            )
-
-            import pprint
-            pprint.pprint(response)  # Debugging: print the full response
-
-            
-            # Extract text and images from response
-            if response.candidates and response.candidates[0].content.parts:
-                text_parts = []
-                image_paths = []
-                
-                for part in response.candidates[0].content.parts:
-                    if hasattr(part, 'text') and part.text:
-                        text_parts.append(part.text)
-                    elif hasattr(part, 'inline_data') and part.inline_data:
-                        # Save image to temporary file
-                        image_path = await self._save_image_from_inline_data(part.inline_data)
-                        if image_path:
-                            image_paths.append(image_path)
-                
-                final_response = ' '.join(text_parts) if text_parts else ""
-                
-                # If images were generated, include them in response
-                if image_paths:
-                    # Return special format that indicates images
-                    image_info = "|".join(image_paths)
-                    return f"[IMAGE_GENERATED:{image_info}]\n{final_response}"
-                
-                # Check if web search was actually used (not just enabled)
-                if web_search_mode and hasattr(response.candidates[0], 'grounding_metadata'):
-                    # Just add a simple indicator that search was used
-                    return f"🔍 *Web search used*\n\n{final_response}"
-                
-                return final_response if final_response else "I couldn't generate a response."
-            else:
-                return "I couldn't generate a response."
+            if coalesce:
+                return await _inflight_requests.run(cache_key, produce)
+            return await produce()
             
         except Exception as e:
             error_msg = f"Error generating response: {str(e)}"
             print(error_msg)
             return f"I apologize, but I encountered an error: {str(e)}"
     
+    async def _prepare_request(
+        self,
+        messages: List[Dict[str, Any]],
+        model_name: str,
+        max_tokens: Optional[int],
+        temperature: float,
+        thinking_tokens: Optional[int],
+        web_search_mode: bool,
+        conversation_id: Any = None,
+    ) -> Tuple[List[Any], types.GenerateContentConfig]:
+        """Format contents and build the generation config for a request
+        
+        Returns (contents, config); shared by the streaming and
+        non-streaming paths so a stream fallback does not redo the work.
+        """
+        is_image_gen = model_name in self._image_gen_models
+        
+        # Build generation config
+        generation_config = _build_config(
+            round(temperature, 2),
+            max_tokens,
+            thinking_tokens,
+            web_search_mode and not is_image_gen,
+        )
+        
+        # Use full conversation history for Gemini text models
+        contents = self._prepare_messages(messages, conversation_id)
+        contents, generation_config = await self._apply_context_cache(
+            messages, contents, model_name, generation_config, web_search_mode
+        )
+        return contents, generation_config
+    
+    async def _apply_context_cache(
+        self,
+        messages: List[Dict[str, Any]],
+        contents: List[Any],
+        model_name: str,
+        generation_config: types.GenerateContentConfig,
+        web_search_mode: bool,
+    ) -> Tuple[List[Any], types.GenerateContentConfig]:
+        """Serve a long leading message from a Gemini context cache
+        
+        The first message of a conversation is re-sent unchanged every turn;
+        once it is long enough to qualify for explicit caching it is uploaded
+        once and referenced via cached_content, which bills it at the cached
+        input rate and skips its prefill.
+        """
+        min_tokens = settings.GEMINI_CONTEXT_CACHE_MIN_TOKENS
+        # Requests using cached content cannot also carry tools
+        if min_tokens <= 0 or web_search_mode or len(contents) < 2:
+            return contents, generation_config
+        
+        first = messages[0]
+        text = first.get("content") or ""
+        # Rough token estimate of ~4 characters per token
+        if first.get("image_data") or len(text) < min_tokens * 4:
+            return contents, generation_config
+        
+        key = (model_name, hashlib.sha256(text.encode("utf-8")).hexdigest())
+        now = time.monotonic()
+        cached = _CONTEXT_CACHES.get(key)
+        if cached is None or cached[1] <= now:
+            try:
+                cache = await self.client.aio.caches.create(
+                    model=model_name,
+                    config=types.CreateCachedContentConfig(
+                        contents=[contents[0]],
+                        ttl=f"{CONTEXT_CACHE_TTL}s",
+                    ),
+                )
+                # Refresh a minute early so a request never references an expired cache
+                cached = (cache.name, now + CONTEXT_CACHE_TTL - 60)
+            except Exception as e:
+                logger.warning("Gemini context cache creation failed: %s", e)
+                cached = (None, now + CONTEXT_CACHE_TTL)
+            _CONTEXT_CACHES[key] = cached
+        
+        cache_name = cached[0]
+        if not cache_name:
+            return contents, generation_config
+        return contents[1:], generation_config.model_copy(update={"cached_content": cache_name})
+    
+    async def _execute_non_stream(
+        self,
+        contents: List[Any],
+        model_name: str,
+        generation_config: types.GenerateContentConfig,
+        web_search_mode: bool,
+    ) -> Tuple[str, bool]:
+        """Call generate_content and return (response text, whether it may be cached)"""
+        logger.debug("Generating response with model: %s, config: %s", model_name, generation_config)
+        # Generate response
+        response = await self._generate_content_with_retry(model_name, contents, generation_config)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Gemini response id=%s", getattr(response, 'response_id', None))
+        
+        # Extract text and images from response
+        candidates = getattr(response, 'candidates', None)
+        content = getattr(candidates[0], 'content', None) if candidates else None
+        parts = getattr(content, 'parts', None) if content else None
+        if not parts:
+            return "I couldn't generate a response.", False
+        
+        text_parts = []
+        image_paths = []
+        
+        for part in parts:
+            text = getattr(part, 'text', None)
+            if text:
+                text_parts.append(text)
+                continue
+            inline_data = getattr(part, 'inline_data', None)
+            if inline_data:
+                # Save image to temporary file
+                image_path = await self._save_image_from_inline_data(inline_data)
+                if image_path:
+                    image_paths.append(image_path)
+        
+        final_response = ''.join(text_parts)
+        
+        # If images were generated, include them in response
+        if image_paths:
+            # Return special format that indicates images
+            image_info = "|".join(image_paths)
+            return f"[IMAGE_GENERATED:{image_info}]\n{final_response}", False
+        
+        if not final_response:
+            return "I couldn't generate a response.", False
+        
+        # Check if web search was actually used (not just enabled)
+        if web_search_mode and getattr(candidates[0], 'grounding_metadata', None):
+            # Just add a simple indicator that search was used
+            final_response = f"🔍 *Web search used*\n\n{final_response}"
+        
+        return final_response, True
+    
+    async def _generate_content_with_retry(
+        self,
+        model_name: str,
+        contents: List[Any],
+        generation_config: types.GenerateContentConfig,
+    ):
+        """Call generate_content, retrying rate-limit and unavailable errors with backoff"""
+        for attempt in range(RETRY_ATTEMPTS):
+            try:
+                async with self._sem:
+                    return await self.client.aio.models.generate_content(
+                        model=model_name,
+                        contents=contents,
+                        config=generation_config,
+                    )
+            except errors.APIError as e:
+                if e.code not in _RETRYABLE_STATUS_CODES or attempt == RETRY_ATTEMPTS - 1:
+                    raise
+                # Sleep outside the semaphore so waiting retries don't hold a slot
+                delay = min(RETRY_BASE_DELAY * 2 ** attempt, RETRY_MAX_DELAY)
+                logger.warning("Gemini returned %s, retrying in %.1fs", e.code, delay)
+                await asyncio.sleep(delay)
+    
+    async def _get_cached_response(self, cache_key: str, use_memory_cache: bool, use_disk_cache: bool) -> Optional[str]:
+        """Look up a response in the memory cache, then the disk cache"""
+        if use_memory_cache:
+            cached = await self._cache.get(cache_key)
+            if cached is not None:
+                return cached
+        if use_disk_cache:
+            cached = await self._disk_cache.get(cache_key)
+            if cached is not None:
+                if use_memory_cache:
+                    await self._cache.set(cache_key, cached)
+                return cached
+        return None
+    
+    async def _store_cached_response(self, cache_key: str, response: str, use_memory_cache: bool, use_disk_cache: bool):
+        """Store a successful response in every enabled cache"""
+        if use_memory_cache:
+            await self._cache.set(cache_key, response)
+        if use_disk_cache:
+            await self._disk_cache.set(cache_key, response)
+    
     async def _save_image_from_inline_data(self, inline_data) -> Optional[str]:
         """Save inline image data to a temporary file"""
         try:
-            # Create temporary directory if it doesn't exist
-            temp_dir = os.path.join(tempfile.gettempdir(), "gemini_images")
-            os.makedirs(temp_dir, exist_ok=True)
-            
-            # Generate unique filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"gemini_image_{timestamp}.png"
-            filepath = os.path.join(temp_dir, filename)
-            
-            # Save image
-            image = Image.open(io.BytesIO(inline_data.data))
-            image.save(filepath, 'PNG')
-            
-            return filepath
+            return await asyncio.to_thread(
+                _save_image_file,
+                inline_data.data,
+                getattr(inline_data, "mime_type", None),
+                _image_dir("gemini_images"),
+                _image_stem("gemini_image"),
+            )
         except Exception as e:
             print(f"Error saving image: {e}")
             return None
@@ -214,34 +613,35 @@ class GeminiClient(BaseLLMClient):
                 return "Please provide a prompt for image generation."
             
             # Generate images
-            response = await self.client.aio.models.generate_images(
-                model=self.models["imagen3"],
-                prompt=prompt,
-                config=types.GenerateImagesConfig(
-                    number_of_images=1,  # Generate 1 image by default
+            async with self._sem:
+                response = await self.client.aio.models.generate_images(
+                    model=self._imagen3_model,
+                    prompt=prompt,
+                    config=types.GenerateImagesConfig(
+                        number_of_images=1,  # Generate 1 image by default
+                    )
                 )
-            )
             
-            # Save generated images
+            temp_dir = _image_dir("imagen3_images")
+            
+            # Save generated images in parallel worker threads
+            results = await asyncio.gather(*(
+                asyncio.to_thread(
+                    _save_image_file,
+                    generated_image.image.image_bytes,
+                    getattr(generated_image.image, "mime_type", None),
+                    temp_dir,
+                    _image_stem("imagen3"),
+                )
+                for i, generated_image in enumerate(response.generated_images)
+            ), return_exceptions=True)
+            
             image_paths = []
-            for i, generated_image in enumerate(response.generated_images):
-                try:
-                    # Create temporary directory
-                    temp_dir = os.path.join(tempfile.gettempdir(), "imagen3_images")
-                    os.makedirs(temp_dir, exist_ok=True)
-                    
-                    # Generate filename
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    filename = f"imagen3_{timestamp}_{i}.png"
-                    filepath = os.path.join(temp_dir, filename)
-                    
-                    # Save image
-                    image = Image.open(io.BytesIO(generated_image.image.image_bytes))
-                    image.save(filepath, 'PNG')
-                    
-                    image_paths.append(filepath)
-                except Exception as e:
-                    print(f"Error saving Imagen3 image {i}: {e}")
+            for i, result in enumerate(results):
+                if isinstance(result, Exception):
+                    logger.warning("Error saving Imagen3 image %d: %s", i, result)
+                else:
+                    image_paths.append(result)
             
             if image_paths:
                 image_info = "|".join(image_paths)
@@ -265,89 +665,124 @@ class GeminiClient(BaseLLMClient):
         options: Optional[Dict[str, Any]] = None,
     ) -> AsyncGenerator[str, None]:
         """Generate a streaming response using google-genai API"""
+        prepared = None
         try:
-            # Prepare messages
-            formatted_messages = self._prepare_messages(messages)
-            
-            # Build generation config
-            config_params = {"temperature": temperature}
-            if max_tokens is not None:
-                config_params["max_output_tokens"] = max_tokens
-            
-            # Add thinking config if enabled
-            if options and options.get("thinking_tokens"):
-                config_params["thinking_config"] = types.ThinkingConfig(
-                    include_thoughts=True,
-                    budget_tokens=int(options["thinking_tokens"]),
-                )
-            
-            generation_config = types.GenerateContentConfig(**config_params)
-            
-            # Use the exact pattern from the documentation
-            stream_iterator = await self.client.aio.models.generate_content_stream(
-                model=model_name,
-                contents=formatted_messages,
-                config=generation_config
+            # Prepare messages and config (streaming does not attach the search tool)
+            conversation_id = options.get("conversation_id") if options else None
+            thinking_tokens = int(options["thinking_tokens"]) if options and options.get("thinking_tokens") else None
+            prepared = await self._prepare_request(
+                messages, model_name, max_tokens, temperature, thinking_tokens, False, conversation_id
             )
+            formatted_messages, generation_config = prepared
             
-            thinking_sent = False
-            in_thinking = False
-            
-            async for chunk in stream_iterator:
-                # Extract text from the proper structure
-                if hasattr(chunk, 'candidates') and chunk.candidates:
-                    for candidate in chunk.candidates:
-                        if hasattr(candidate, 'content') and hasattr(candidate.content, 'parts'):
-                            for part in candidate.content.parts:
-                                if hasattr(part, 'text') and part.text:
-                                    # Check if this is a thinking part
-                                    if thinking_mode and hasattr(part, 'thought') and part.thought:
-                                        if not thinking_sent:
-                                            yield "🧠 **Thinking Process:**\n\n"
-                                            thinking_sent = True
-                                        
-                                        # If thinking text is very long, break it into smaller chunks
-                                        text = part.text
-                                        if len(text) > 200:  # If text is long, break it up
-                                            # Split by sentences or newlines for natural breaks
-                                            lines = text.split('\n')
-                                            current_chunk = ""
-                                            
-                                            for line in lines:
-                                                if len(current_chunk) + len(line) > 200:
-                                                    if current_chunk:
-                                                        yield current_chunk + "\n"
-                                                        current_chunk = line
-                                                else:
-                                                    current_chunk += line + "\n" if current_chunk else line
-                                            
-                                            if current_chunk:
-                                                yield current_chunk
-                                        else:
-                                            yield text
-                                    else:
-                                        # Regular text
-                                        if thinking_mode and thinking_sent and not in_thinking:
-                                            # First non-thinking text after thinking
-                                            yield "\n\n💬 **Response:**\n\n"
-                                            in_thinking = True
-                                        yield part.text
-                elif hasattr(chunk, 'text') and chunk.text:
-                    # Fallback to direct text attribute if it exists
-                    yield chunk.text
+            # Hold a concurrency slot for the whole stream, not just its creation
+            async with self._sem:
+                # Use the exact pattern from the documentation
+                stream_iterator = await self.client.aio.models.generate_content_stream(
+                    model=model_name,
+                    contents=formatted_messages,
+                    config=generation_config
+                )
+                
+                # Coalesce small SDK chunks so downstream consumers see fewer, larger updates
+                buffer = []
+                buffered_len = 0
+                last_flush = time.monotonic()
+                
+                async for text in self._iter_stream_text(stream_iterator, thinking_mode):
+                    buffer.append(text)
+                    buffered_len += len(text)
+                    now = time.monotonic()
+                    if buffered_len >= STREAM_FLUSH_CHARS or now - last_flush >= STREAM_FLUSH_INTERVAL:
+                        yield "".join(buffer)
+                        buffer = []
+                        buffered_len = 0
+                        last_flush = now
+                
+                if buffer:
+                    yield "".join(buffer)
                     
         except Exception as e:
             # Fall back to non-streaming on error
-            response = await self.generate_response(
-                messages=messages,
-                model_name=model_name,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                thinking_mode=thinking_mode,
-                web_search_mode=web_search_mode
-            )
+            if prepared is None or web_search_mode:
+                # Preparation itself failed, or the fallback needs the search tool
+                response = await self.generate_response(
+                    messages=messages,
+                    model_name=model_name,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    thinking_mode=thinking_mode,
+                    web_search_mode=web_search_mode,
+                    options=options,
+                )
+            else:
+                # Reuse the already formatted contents and config
+                formatted_messages, generation_config = prepared
+                try:
+                    response, _ = await self._execute_non_stream(
+                        formatted_messages, model_name, generation_config, False
+                    )
+                except Exception as e:
+                    print(f"Error generating response: {str(e)}")
+                    response = f"I apologize, but I encountered an error: {str(e)}"
             yield response
     
+    async def _iter_stream_text(self, stream_iterator, thinking_mode: bool) -> AsyncGenerator[str, None]:
+        """Yield text pieces from a google-genai stream, adding thinking headers"""
+        thinking_sent = False
+        in_thinking = False
+        
+        async for chunk in stream_iterator:
+            # Extract text from the proper structure
+            candidates = getattr(chunk, 'candidates', None)
+            if candidates:
+                for candidate in candidates:
+                    content = getattr(candidate, 'content', None)
+                    parts = getattr(content, 'parts', None) if content else None
+                    if not parts:
+                        continue
+                    for part in parts:
+                        text = getattr(part, 'text', None)
+                        if not text:
+                            continue
+                        # Check if this is a thinking part
+                        if thinking_mode and getattr(part, 'thought', None):
+                            if not thinking_sent:
+                                yield "🧠 **Thinking Process:**\n\n"
+                                thinking_sent = True
+                            
+                            # If thinking text is very long, break it into smaller chunks
+                            if len(text) > 200:  # If text is long, break it up
+                                # Split on newlines for natural breaks, ~200 characters per piece
+                                chunk_lines = []
+                                chunk_len = 0
+                                
+                                for line in text.splitlines(keepends=True):
+                                    if chunk_lines and chunk_len + len(line) > 200:
+                                        yield ''.join(chunk_lines)
+                                        chunk_lines = [line]
+                                        chunk_len = len(line)
+                                    else:
+                                        chunk_lines.append(line)
+                                        chunk_len += len(line)
+                                
+                                if chunk_lines:
+                                    yield ''.join(chunk_lines)
+                            else:
+                                yield text
+                        else:
+                            # Regular text
+                            if thinking_mode and thinking_sent and not in_thinking:
+                                # First non-thinking text after thinking
+                                yield "\n\n💬 **Response:**\n\n"
+                                in_thinking = True
+                            yield text
+            else:
+                text = getattr(chunk, 'text', None)
+                if text:
+                    # Fallback to direct text attribute if it exists
+                    yield text
+    
     def get_available_models(self) -> Dict[str, str]:
         """Get available Gemini models"""
         return self.models.copy()
@@ -362,5 +797,5 @@ class GeminiClient(BaseLLMClient):
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit"""
-        # No cleanup needed for Gemini client
-        pass
+        if self._semantic_cache:
+            await self._semantic_cache.save()
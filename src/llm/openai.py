@@ -1,17 +1,56 @@
 """OpenAI GPT‑5 client using the Responses API"""
 
+import functools
+import hashlib
 import logging
+import time
 from typing import List, Dict, Any, AsyncGenerator, Optional
-import asyncio
-import threading
 
-from openai import OpenAI
+import httpx
+from openai import AsyncOpenAI
 
 from .base import BaseLLMClient
+from .cache import InflightRequests, get_response_cache, make_cache_key
 from ..config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Connection pool shared by every request; keep-alive connections skip the TLS handshake
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60.0)
+HTTP_TIMEOUT = httpx.Timeout(connect=10.0, read=120.0, write=30.0, pool=5.0)
+
+# Speaker labels used when flattening history; any non-user role is the assistant
+_MESSAGE_PREFIX = {"user": "User: "}
+_ASSISTANT_PREFIX = "Assistant: "
+_IMAGE_NOTE = "[User attached an image]"
+
+# Stream deltas are batched before yielding: the first flush is small for a fast
+# first update, then the size threshold grows so later updates are coarser
+STREAM_FLUSH_MIN_CHARS = 16
+STREAM_FLUSH_MAX_CHARS = 256
+STREAM_FLUSH_GROWTH = 1.5
+STREAM_FLUSH_INTERVAL = 0.4  # seconds
+
+# Identical cacheable requests in flight at the same time share one API call
+_inflight_requests = InflightRequests()
+
+
+@functools.lru_cache(maxsize=None)
+def _get_openai_client(api_key: str) -> AsyncOpenAI:
+    """Return the shared OpenAI client, multiplexing requests over HTTP/2"""
+    transport = httpx.AsyncHTTPTransport(http2=True, retries=1, limits=HTTP_LIMITS)
+    return AsyncOpenAI(
+        api_key=api_key,
+        http_client=httpx.AsyncClient(transport=transport, timeout=HTTP_TIMEOUT),
+    )
+
+
+async def close_shared_client():
+    """Close the shared OpenAI client's connection pool; call once on shutdown"""
+    if settings.OPENAI_API_KEY and _get_openai_client.cache_info().currsize:
+        await _get_openai_client(settings.OPENAI_API_KEY).close()
+        _get_openai_client.cache_clear()
+
 
 class OpenAIClient(BaseLLMClient):
     """OpenAI client targeting GPT‑5 family via Responses API"""
@@ -19,25 +58,46 @@ class OpenAIClient(BaseLLMClient):
     def __init__(self):
         if not settings.OPENAI_API_KEY:
             raise RuntimeError("OPENAI_API_KEY not configured")
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.client = _get_openai_client(settings.OPENAI_API_KEY)
         self.models = {
             "gpt-5": "gpt-5",
             "gpt-5-chat": "gpt-5-chat-latest",
         }
+        # Exact-match cache shared with the other providers
+        self._cache = get_response_cache()
 
     def _flatten_messages_to_input(self, messages: List[Dict[str, Any]]) -> str:
         """Flatten role-tagged messages to a single textual prompt for Responses.input.
         We omit image payloads for now."""
-        lines = []
+        parts = []
         for msg in messages:
-            role = msg.get("role", "user")
+            parts.append(_MESSAGE_PREFIX.get(msg.get("role", "user"), _ASSISTANT_PREFIX))
             text = msg.get("content") or ""
-            # If images are present, note them in text for context
+            # If images are present, note them in text for context; the note is
+            # appended after the text with surrounding whitespace trimmed
             if msg.get("image_data"):
-                text = (text + "\n[User attached an image]").strip()
-            prefix = "User" if role == "user" else "Assistant"
-            lines.append(f"{prefix}: {text}")
-        return "\n".join(lines)
+                text = text.lstrip()
+                if text:
+                    parts.append(text)
+                    parts.append("\n")
+                parts.append(_IMAGE_NOTE)
+            elif text:
+                parts.append(text)
+            parts.append("\n")
+        if parts:
+            parts.pop()  # no newline after the last message
+        return "".join(parts)
+
+    def _prompt_cache_key(self, messages: List[Dict[str, Any]], options: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Return a stable key so OpenAI routes a conversation to its cached prompt prefix.
+        Falls back to a hash of the opening message when no conversation id is given."""
+        conversation_id = (options or {}).get("conversation_id")
+        if conversation_id is not None:
+            return f"conversation-{conversation_id}"
+        if not messages:
+            return None
+        opening = self._flatten_messages_to_input(messages[:1])
+        return hashlib.sha1(opening.encode("utf-8")).hexdigest()[:32]
 
     def _supports_reasoning(self, model_name: str) -> bool:
         """Return True if the model supports the Responses `reasoning` param.
@@ -87,20 +147,45 @@ class OpenAIClient(BaseLLMClient):
             if max_tokens is not None:
                 kwargs["max_output_tokens"] = max_tokens
 
+            # Only near-deterministic requests without live search are worth caching.
+            # LLMCache treats backend errors as misses, so a cache outage never fails the request.
+            cache_key = None
+            if temperature <= 0.1 and not web_search_mode and "tools" not in kwargs:
+                cache_key = make_cache_key(kwargs)
+                cached = await self._cache.get(cache_key)
+                if cached is not None:
+                    return cached
+
+            # Sent via extra_body so older SDK versions without the parameter still work
+            prompt_cache_key = self._prompt_cache_key(messages, options)
+            if prompt_cache_key:
+                kwargs["extra_body"] = {"prompt_cache_key": prompt_cache_key}
+
             logger.info(f"OpenAI Responses request: model={model_name}, effort={effort}, verbosity={verbosity}, search_context_size={search_ctx}")
-            resp = await self.client.responses.with_options(timeout=120).create_async(**kwargs)
 
-            if hasattr(resp, "output_text") and resp.output_text:
-                return resp.output_text
-            # Fallback: stitch text from outputs
-            try:
-                parts = []
-                for item in getattr(resp, "output", []) or []:
-                    if getattr(item, "type", "") == "output_text" and getattr(item, "text", ""):
-                        parts.append(item.text)
-                return "".join(parts) if parts else "I couldn't generate a response."
-            except Exception:
-                return "I couldn't generate a response."
+            async def produce() -> str:
+                resp = await self.client.responses.with_options(timeout=120).create(**kwargs)
+
+                text = getattr(resp, "output_text", None)
+                if not text:
+                    # Fallback: stitch text from outputs
+                    try:
+                        parts = []
+                        for item in getattr(resp, "output", []) or []:
+                            if getattr(item, "type", "") == "output_text" and getattr(item, "text", ""):
+                                parts.append(item.text)
+                        text = "".join(parts)
+                    except Exception:
+                        text = ""
+                if not text:
+                    return "I couldn't generate a response."
+                if cache_key:
+                    await self._cache.set(cache_key, text)
+                return text
+
+            if cache_key:
+                return await _inflight_requests.run(cache_key, produce)
+            return await produce()
         except Exception as e:
             logger.exception("OpenAI error")
             return "I apologize, but I encountered an error processing your request."
@@ -135,6 +220,9 @@ class OpenAIClient(BaseLLMClient):
                 }]
             if max_tokens is not None:
                 kwargs["max_output_tokens"] = max_tokens
+            prompt_cache_key = self._prompt_cache_key(messages, options)
+            if prompt_cache_key:
+                kwargs["extra_body"] = {"prompt_cache_key": prompt_cache_key}
 
             logger.info(
                 "OpenAI create(stream=True) start: model=%s, reasoning=%s, web_search=%s, verbosity=%s",
@@ -144,57 +232,37 @@ class OpenAIClient(BaseLLMClient):
                 verbosity,
             )
 
-            loop = asyncio.get_event_loop()
-            q: asyncio.Queue = asyncio.Queue()
-
-            def run_stream():
-                try:
-                    # Prefer the normal .create(..., stream=True) API
-                    stream_obj = self.client.responses.create(stream=True, **kwargs)
-                    # Try as context manager first; fall back to direct iteration
-                    try:
-                        cm = getattr(stream_obj, "__enter__", None)
-                        if callable(cm):
-                            with stream_obj as stream:
-                                for event in stream:
-                                    etype = getattr(event, "type", None)
-                                    if etype == "response.output_text.delta":
-                                        delta = getattr(event, "delta", "") or ""
-                                        asyncio.run_coroutine_threadsafe(q.put(("text", delta)), loop)
-                                    elif etype == "response.error":
-                                        asyncio.run_coroutine_threadsafe(q.put(("error", "")), loop)
-                                        break
-                        else:
-                            for event in stream_obj:
-                                etype = getattr(event, "type", None)
-                                if etype == "response.output_text.delta":
-                                    delta = getattr(event, "delta", "") or ""
-                                    asyncio.run_coroutine_threadsafe(q.put(("text", delta)), loop)
-                                elif etype == "response.error":
-                                    asyncio.run_coroutine_threadsafe(q.put(("error", "")), loop)
-                                    break
-                    finally:
-                        # Attempt to close if close() exists
-                        try:
-                            getattr(stream_obj, "close", lambda: None)()
-                        except Exception:
-                            pass
-                    asyncio.run_coroutine_threadsafe(q.put(("done", "")), loop)
-                except Exception:
-                    logger.exception("OpenAI create(stream=True) error")
-                    asyncio.run_coroutine_threadsafe(q.put(("error", "")), loop)
-
-            threading.Thread(target=run_stream, daemon=True).start()
-
-            while True:
-                kind, payload = await q.get()
-                if kind == "text":
-                    yield payload
-                elif kind == "done":
-                    break
-                elif kind == "error":
-                    yield "I apologize, but I encountered an error while generating the response."
-                    break
+            stream = await self.client.responses.with_options(timeout=120).create(stream=True, **kwargs)
+            buffer: List[str] = []
+            buffered_len = 0
+            threshold = STREAM_FLUSH_MIN_CHARS
+            last_flush = time.monotonic()
+            try:
+                async for event in stream:
+                    etype = getattr(event, "type", None)
+                    if etype == "response.output_text.delta":
+                        delta = getattr(event, "delta", "") or ""
+                        if not delta:
+                            continue
+                        buffer.append(delta)
+                        buffered_len += len(delta)
+                        now = time.monotonic()
+                        if buffered_len >= threshold or now - last_flush >= STREAM_FLUSH_INTERVAL:
+                            yield "".join(buffer)
+                            buffer = []
+                            buffered_len = 0
+                            last_flush = now
+                            threshold = min(STREAM_FLUSH_MAX_CHARS, int(threshold * STREAM_FLUSH_GROWTH))
+                    elif etype == "response.error":
+                        if buffer:
+                            yield "".join(buffer)
+                            buffer = []
+                        yield "I apologize, but I encountered an error while generating the response."
+                        break
+                if buffer:
+                    yield "".join(buffer)
+            finally:
+                await stream.close()
         except Exception:
             logger.exception("OpenAI streaming error")
             yield "I apologize, but I encountered an error while generating the response."
@@ -210,5 +278,5 @@ class OpenAIClient(BaseLLMClient):
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        # OpenAI client has no async close requirement
+        # The client is shared across instances; close_shared_client() closes it on shutdown
         pass
@@ -0,0 +1,141 @@
+"""Semantic response cache for paraphrased prompts (requires the semantic-cache extra)"""
+
+import asyncio
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, List, Optional, Tuple
+
+from ..config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+EMBEDDING_DIM = 384
+
+# Minimum seconds between index snapshots written to disk
+SAVE_INTERVAL = 300
+
+
+class SemanticCache:
+    """Nearest-neighbour cache from prompt embeddings to responses"""
+
+    def __init__(self, directory: Optional[str], threshold: float = 0.92, capacity: int = 10000):
+        self.directory = directory
+        self.threshold = threshold
+        self.capacity = capacity
+        self.enabled = True
+        self._model = None
+        self._index = None
+        # Parallel to the index labels: (scope, response); scope is the model name
+        # plus a hash of any per-user context, see gemini._semantic_scope
+        self._entries: List[Tuple[str, str]] = []
+        self._dirty = False
+        self._last_save = time.monotonic()
+        # Embedding and index work runs in worker threads
+        self._lock = threading.Lock()
+
+    def _paths(self) -> Tuple[str, str]:
+        return (
+            os.path.join(self.directory, "index.bin"),
+            os.path.join(self.directory, "entries.json"),
+        )
+
+    def _ensure_loaded(self):
+        """Load the embedding model and index on first use"""
+        if self._model is not None:
+            return
+        import hnswlib
+        from sentence_transformers import SentenceTransformer
+
+        index = hnswlib.Index(space="cosine", dim=EMBEDDING_DIM)
+        index_path, entries_path = self._paths() if self.directory else (None, None)
+        if index_path and os.path.exists(index_path) and os.path.exists(entries_path):
+            index.load_index(index_path, max_elements=self.capacity)
+            with open(entries_path, "r", encoding="utf-8") as f:
+                self._entries = [tuple(entry) for entry in json.load(f)]
+        else:
+            index.init_index(max_elements=self.capacity, ef_construction=200, M=16)
+        self._index = index
+        self._model = SentenceTransformer(EMBEDDING_MODEL)
+
+    def _lookup(self, prompt: str, model_name: str) -> Tuple[Optional[str], Any]:
+        with self._lock:
+            self._ensure_loaded()
+            vector = self._model.encode([prompt], normalize_embeddings=True)[0]
+            if self._index.get_current_count():
+                labels, distances = self._index.knn_query(vector, k=1)
+                cached_model, response = self._entries[int(labels[0][0])]
+                similarity = 1 - float(distances[0][0])
+                if cached_model == model_name and similarity >= self.threshold:
+                    return response, vector
+            return None, vector
+
+    def _add(self, vector: Any, model_name: str, response: str):
+        with self._lock:
+            # The index has a fixed capacity; once full it is served read-only
+            if len(self._entries) >= self.capacity:
+                return
+            self._index.add_items([vector], [len(self._entries)])
+            self._entries.append((model_name, response))
+            self._dirty = True
+
+    def _save(self, force: bool):
+        with self._lock:
+            if not (self.directory and self._dirty):
+                return
+            if not force and time.monotonic() - self._last_save < SAVE_INTERVAL:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            index_path, entries_path = self._paths()
+            self._index.save_index(index_path)
+            with open(entries_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f)
+            self._dirty = False
+            self._last_save = time.monotonic()
+
+    async def lookup(self, prompt: str, model_name: str) -> Tuple[Optional[str], Any]:
+        """Return (cached response or None, prompt embedding)"""
+        if not self.enabled:
+            return None, None
+        try:
+            return await asyncio.to_thread(self._lookup, prompt, model_name)
+        except ImportError as e:
+            logger.warning("Semantic cache disabled, missing dependency: %s", e)
+            self.enabled = False
+            return None, None
+        except Exception:
+            # A corrupt index or failing model load must not break requests
+            logger.exception("Semantic cache disabled after lookup failure")
+            self.enabled = False
+            return None, None
+
+    async def add(self, vector: Any, model_name: str, response: str):
+        """Remember a response for the prompt embedding returned by lookup"""
+        if self.enabled and vector is not None:
+            try:
+                await asyncio.to_thread(self._add, vector, model_name, response)
+            except Exception:
+                logger.exception("Semantic cache add failed")
+
+    async def save(self, force: bool = False):
+        """Persist the index if it changed, at most once per SAVE_INTERVAL unless forced"""
+        if self.enabled and self._index is not None:
+            try:
+                await asyncio.to_thread(self._save, force)
+            except Exception:
+                logger.exception("Semantic cache save failed")
+
+
+@functools.lru_cache(maxsize=None)
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """Return the process-wide semantic cache, or None when it is disabled"""
+    if not settings.SEMANTIC_CACHE_ENABLED:
+        return None
+    return SemanticCache(
+        settings.SEMANTIC_CACHE_DIR or None,
+        threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+    )
@@ -3,30 +3,49 @@
 import asyncio
 import sys
 import logging
+import logging.handlers
+import queue
+import signal
 from pathlib import Path
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-# Configure logging
+# Configure logging: records are queued on the event loop thread and
+# written to stdout by a listener thread, so slow stdout never blocks the bot
+_log_queue = queue.SimpleQueue()
+_stdout_handler = logging.StreamHandler(sys.stdout)
+_stdout_handler.setFormatter(
+    logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+)
+# The queue handler only merges args into the message; the prefix is added once by _stdout_handler
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    format='%(message)s',
     handlers=[
-        logging.StreamHandler(sys.stdout)
+        logging.handlers.QueueHandler(_log_queue)
     ]
 )
+_log_listener = logging.handlers.QueueListener(_log_queue, _stdout_handler, respect_handler_level=True)
+_log_listener.start()
 
 # Set specific loggers to appropriate levels
 logging.getLogger('telethon').setLevel(logging.WARNING)
 logging.getLogger('httpx').setLevel(logging.WARNING)
 
+try:
+    import uvloop  # Optional faster event loop (install the "uvloop" extra)
+except ImportError:
+    uvloop = None
+
 from telethon import TelegramClient
 from src.config import settings
 from src.config.whitelist_db import DatabaseWhitelistManager
 from src.database import DatabaseManager
 from src.bot import CommandHandler, CallbackHandler, MessageHandler
 from src.bot.decorators import set_whitelist_manager
+from src.llm.openai import close_shared_client as close_openai_client
+from src.llm.semantic_cache import get_semantic_cache
 
 logger = logging.getLogger(__name__)
 
@@ -43,8 +62,6 @@ async def main():
     
     # Initialize database
     db_manager = DatabaseManager()
-    await db_manager.init()
-    logger.info("✅ Database initialized")
     
     # Initialize Telegram client
     client = TelegramClient(
@@ -53,22 +70,26 @@ async def main():
         settings.API_HASH
     )
     
-    # Start the client
-    await client.start(bot_token=settings.BOT_TOKEN)
+    # Database setup and the Telegram handshake are independent, so overlap them
+    await asyncio.gather(
+        db_manager.init(),
+        client.start(bot_token=settings.BOT_TOKEN),
+    )
+    logger.info("✅ Database initialized")
     logger.info("✅ Telegram client connected")
     
-    # Get bot info
-    me = await client.get_me()
-    logger.info(f"✅ Bot started as @{me.username}")
-    
     # Initialize database-based whitelist manager
     whitelist_manager = DatabaseWhitelistManager(db_manager, cache_ttl=settings.WHITELIST_CACHE_TTL)
     
     # Set the global whitelist manager for decorators
     set_whitelist_manager(whitelist_manager)
     
-    # Load initial whitelist
-    authorized_users = await whitelist_manager.get_authorized_users()
+    # Get bot info and load initial whitelist
+    me, authorized_users = await asyncio.gather(
+        client.get_me(),
+        whitelist_manager.get_authorized_users(),
+    )
+    logger.info(f"✅ Bot started as @{me.username}")
     logger.info(f"✅ Whitelist loaded from database: {authorized_users}")
     
     # Initialize handlers
@@ -77,26 +98,61 @@ async def main():
     message_handler = MessageHandler(client, db_manager)
     
     # Register all handlers
-    command_handler.register_handlers()
-    callback_handler.register_handlers()
-    message_handler.register_handlers()
+    for handler in (command_handler, callback_handler, message_handler):
+        handler.register_handlers()
     
     logger.info("✅ All handlers registered")
     logger.info("\n🤖 Bot is running! Press Ctrl+C to stop.\n")
     
+    # SIGTERM (container shutdown) and SIGINT stop the bot through the cleanup below
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Not supported on Windows; Ctrl+C still raises KeyboardInterrupt there
+            pass
+    
+    running = asyncio.ensure_future(client.run_until_disconnected())
+    stopping = asyncio.ensure_future(stop.wait())
     try:
-        # Keep the bot running
-        await client.run_until_disconnected()
+        # Keep the bot running until it disconnects or a stop signal arrives
+        await asyncio.wait([running, stopping], return_when=asyncio.FIRST_COMPLETED)
+        if stop.is_set():
+            logger.info("\n⏹️ Stop signal received, shutting down")
+        else:
+            # Surface errors from the client
+            running.result()
     except KeyboardInterrupt:
         logger.info("\n⏹️ Bot stopped by user")
     except Exception as e:
         logger.error(f"Unexpected error: {e}", exc_info=True)
     finally:
         # Cleanup
+        for task in (running, stopping):
+            task.cancel()
         await db_manager.close()
+        await close_openai_client()
+        # Per-message saves are throttled; persist whatever is still pending
+        semantic_cache = get_semantic_cache()
+        if semantic_cache:
+            await semantic_cache.save(force=True)
         await client.disconnect()
         logger.info("✅ Cleanup completed")
 
 
+def run():
+    """Run the bot, on uvloop when it is installed"""
+    try:
+        if uvloop is not None:
+            uvloop.run(main())
+        else:
+            asyncio.run(main())
+    finally:
+        # Flush queued log records before exiting
+        _log_listener.stop()
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    run()
\ No newline at end of file
@@ -3,21 +3,99 @@
 import os
 import uuid
 import base64
+import asyncio
+import errno
+import functools
 import shutil
 from pathlib import Path
 from typing import Optional, Tuple
 import aiofiles
-import mimetypes
+import aiofiles.os
 from PIL import Image
 import io
 
 from ..config.storage import (
     STORAGE_DIRS,
     FILE_EXTENSION_MAP,
+    MIME_TYPE_MAP,
     DEFAULT_IMAGE_EXTENSION,
     ensure_storage_dirs
 )
 
+# Uploads larger than this on either side are downscaled before storing;
+# vision models resize to about this size anyway
+MAX_IMAGE_SIDE = 2048
+JPEG_QUALITY = 85
+
+
+def _downscale_image(image_bytes: bytes) -> Optional[bytes]:
+    """Return a downscaled JPEG re-encoding of an oversized image, or None to keep it as-is"""
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            if max(image.size) <= MAX_IMAGE_SIDE:
+                return None
+            # Lets the JPEG decoder skip straight to a reduced scale
+            image.draft("RGB", (MAX_IMAGE_SIDE, MAX_IMAGE_SIDE))
+            image.thumbnail((MAX_IMAGE_SIDE, MAX_IMAGE_SIDE), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            image.convert("RGB").save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+            return buffer.getvalue()
+    except Exception as e:
+        # Unreadable images are stored untouched
+        print(f"Error downscaling image: {e}")
+        return None
+
+
+@functools.lru_cache(maxsize=64)
+def _encode_file(file_path: str, mtime: float) -> str:
+    """Base64-encode a file; the mtime argument invalidates entries for rewritten files"""
+    with open(file_path, 'rb') as f:
+        return base64.b64encode(f.read()).decode('utf-8')
+
+
+def _move_file(source_path: str, dest_path: str):
+    """Move a file, renaming in place when possible and copying in-kernel across devices"""
+    try:
+        os.rename(source_path, dest_path)
+        return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    
+    # Different filesystem: sendfile copies without passing bytes through Python
+    copied = False
+    if hasattr(os, "sendfile"):
+        try:
+            with open(source_path, 'rb') as src, open(dest_path, 'wb') as dst:
+                size = os.fstat(src.fileno()).st_size
+                offset = 0
+                while offset < size:
+                    sent = os.sendfile(dst.fileno(), src.fileno(), offset, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+            copied = True
+        except OSError:
+            # sendfile is unsupported for some file types; drop the partial copy
+            try:
+                os.unlink(dest_path)
+            except FileNotFoundError:
+                pass
+    if not copied:
+        shutil.copyfile(source_path, dest_path)
+    shutil.copystat(source_path, dest_path)
+    os.unlink(source_path)
+
+
+def _read_base64(file_path: str) -> Optional[str]:
+    """Return the cached base64 encoding of a file, or None if it is missing or empty"""
+    try:
+        mtime = os.stat(file_path).st_mtime
+        # The file can still be removed between the stat and the read
+        return _encode_file(file_path, mtime) or None
+    except FileNotFoundError:
+        return None
+
 
 class FileHandler:
     """Handles file storage operations"""
@@ -37,6 +115,13 @@ class FileHandler:
         Returns:
             Path to the saved file
         """
+        # Shrink oversized uploads so every later request carries fewer bytes
+        if mime_type is None or mime_type.startswith("image/"):
+            downscaled = await asyncio.to_thread(_downscale_image, image_bytes)
+            if downscaled is not None:
+                image_bytes = downscaled
+                mime_type = "image/jpeg"
+        
         # Generate unique filename
         file_id = str(uuid.uuid4())
         extension = FILE_EXTENSION_MAP.get(mime_type, DEFAULT_IMAGE_EXTENSION)
@@ -69,9 +154,9 @@ class FileHandler:
         # Destination path
         dest_path = STORAGE_DIRS["generated_images"] / filename
         
-        # Move file to permanent storage
-        # Use shutil.move instead of os.rename to handle cross-device moves
-        shutil.move(source_path, str(dest_path))
+        # Move file to permanent storage off the event loop
+        # (temp files usually live on another filesystem, e.g. tmpfs)
+        await asyncio.to_thread(_move_file, source_path, str(dest_path))
         
         return str(dest_path)
     
@@ -85,11 +170,12 @@ class FileHandler:
         Returns:
             Image bytes or None if file doesn't exist
         """
-        if not os.path.exists(file_path):
+        # Opening directly saves a separate existence check on the event loop
+        try:
+            async with aiofiles.open(file_path, 'rb') as f:
+                return await f.read()
+        except FileNotFoundError:
             return None
-        
-        async with aiofiles.open(file_path, 'rb') as f:
-            return await f.read()
     
     async def get_image_base64(self, file_path: str) -> Optional[str]:
         """
@@ -101,12 +187,10 @@ class FileHandler:
         Returns:
             Base64 encoded image or None if file doesn't exist
         """
-        image_bytes = await self.get_image_bytes(file_path)
-        if image_bytes:
-            return base64.b64encode(image_bytes).decode('utf-8')
-        return None
+        # The whole history is reloaded every turn, so encodings are cached per file
+        return await asyncio.to_thread(_read_base64, file_path)
     
-    def delete_image(self, file_path: str) -> bool:
+    async def delete_image(self, file_path: str) -> bool:
         """
         Delete an image file
         
@@ -117,9 +201,10 @@ class FileHandler:
             True if deleted successfully, False otherwise
         """
         try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                return True
+            await aiofiles.os.remove(file_path)
+            return True
+        except FileNotFoundError:
+            pass
         except Exception as e:
             print(f"Error deleting file {file_path}: {e}")
         return False
@@ -134,8 +219,8 @@ class FileHandler:
         Returns:
             MIME type string
         """
-        mime_type, _ = mimetypes.guess_type(file_path)
-        return mime_type or "application/octet-stream"
+        # Only the image types in FILE_EXTENSION_MAP are ever stored
+        return MIME_TYPE_MAP.get(Path(file_path).suffix.lower(), "application/octet-stream")
 
 
 # Global instance
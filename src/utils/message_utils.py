@@ -45,27 +45,34 @@ class MessageSplitter:
         Returns:
             List of message parts
         """
+        if len(text) <= max_length:
+            return [text] if text else []
+        
         parts = []
-        current_part = ""
+        # Lines are collected and joined once per part; current_len tracks the joined length
+        current_lines = []
+        current_len = 0
         
         # Split by lines to avoid breaking markdown
         lines = text.split('\n')
         
         for line in lines:
-            if len(current_part) + len(line) + 1 > max_length:
+            if current_len + len(line) + 1 > max_length:
                 # Current part is full, save it and start new
-                if current_part:
-                    parts.append(current_part)
-                current_part = line
-            else:
+                if current_len:
+                    parts.append('\n'.join(current_lines))
+                current_lines = [line]
+                current_len = len(line)
+            elif current_len:
                 # Add line to current part
-                if current_part:
-                    current_part += '\n' + line
-                else:
-                    current_part = line
+                current_lines.append(line)
+                current_len += len(line) + 1
+            else:
+                current_lines = [line]
+                current_len = len(line)
         
         # Add the last part
-        if current_part:
-            parts.append(current_part)
+        if current_len:
+            parts.append('\n'.join(current_lines))
         
         return parts
\ No newline at end of file
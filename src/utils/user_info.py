@@ -1,7 +1,38 @@
 """Utility functions for retrieving Telegram user information"""
 
+import logging
+import time
 from telethon import TelegramClient
-from typing import Optional, Dict, Any, Union
+from typing import Optional, Dict, Any, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Seconds a looked-up user stays cached; profile fields rarely change
+USER_CACHE_TTL = 300
+
+# User ID or lower-cased username -> (lookup time, user information)
+_USER_CACHE: Dict[Union[int, str], Tuple[float, Dict[str, Any]]] = {}
+
+
+def _get_cached_user(key: Union[int, str]) -> Optional[Dict[str, Any]]:
+    """Return a copy of a cached user, or None if missing or expired"""
+    if isinstance(key, str):
+        key = key.lower()
+    entry = _USER_CACHE.get(key)
+    if entry is None:
+        return None
+    if time.monotonic() - entry[0] >= USER_CACHE_TTL:
+        del _USER_CACHE[key]
+        return None
+    return dict(entry[1])
+
+
+def _cache_user(user_info: Dict[str, Any]):
+    """Cache a user under both its ID and username so either lookup hits"""
+    entry = (time.monotonic(), user_info)
+    _USER_CACHE[user_info['id']] = entry
+    if user_info['username']:
+        _USER_CACHE[user_info['username'].lower()] = entry
 
 
 async def get_user_by_id(client: TelegramClient, user_id: int) -> Optional[Dict[str, Any]]:
@@ -15,6 +46,10 @@ async def get_user_by_id(client: TelegramClient, user_id: int) -> Optional[Dict[
     Returns:
         Dictionary with user information or None if user not found
     """
+    cached = _get_cached_user(user_id)
+    if cached is not None:
+        return cached
+    
     try:
         # Get the user entity from their ID
         user = await client.get_entity(user_id)
@@ -33,12 +68,13 @@ async def get_user_by_id(client: TelegramClient, user_id: int) -> Optional[Dict[
             'fake': getattr(user, 'fake', False),
         }
         
-        return user_info
+        _cache_user(user_info)
+        return dict(user_info)
     except ValueError:
         # User not found
         return None
     except Exception as e:
-        print(f"Error retrieving user information: {str(e)}")
+        logger.warning(f"Error retrieving user information: {str(e)}")
         return None
 
 
@@ -61,6 +97,10 @@ async def get_user_by_username_or_id(client: TelegramClient,
             if identifier.startswith('@'):
                 identifier = identifier[1:]
         
+        cached = _get_cached_user(identifier)
+        if cached is not None:
+            return cached
+        
         # Get the user entity
         user = await client.get_entity(identifier)
         
@@ -78,10 +118,11 @@ async def get_user_by_username_or_id(client: TelegramClient,
             'fake': getattr(user, 'fake', False),
         }
         
-        return user_info
+        _cache_user(user_info)
+        return dict(user_info)
     except ValueError:
         # User not found
         return None
     except Exception as e:
-        print(f"Error retrieving user information: {str(e)}")
+        logger.warning(f"Error retrieving user information: {str(e)}")
         return None
\ No newline at end of file